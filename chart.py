@@ -6,11 +6,11 @@ Generates:
   - CSV summary per group (default: by 'root')
   - Outcomes bar chart (stacked or grouped)
   - Time-per-entries (inverse CDF) line plot
-  - NEW: Scatter plot of entries (sample up to 1000), labeled by file name
+  - NEW: Scatter plot of entries (sample up to 1000); fastest/slowest labeled by file name
 
 Usage
 -----
-pip install pandas matplotlib
+pip install pandas matplotlib        # optional: orjson (faster JSON decoding)
 python proof_slice_report.py -i results.json -o report/
 cat results.json | python proof_slice_report.py -i - -o report/
 
@@ -18,7 +18,8 @@ Key options
 -----------
 --group-by        Comma-separated fields to group by (default: root)
 --chart           stacked|grouped (default: grouped)
---scatter-sample  Max entries to label in scatter (default: 1000)
+--scatter-sample  Max entries to plot in scatter (default: 1000)
+--scatter-labels  Label the N fastest and N slowest scatter entries (default: 20)
 --label-field     Field to extract filename labels from (default: smt2)
 --img-fmt         png|svg|pdf (default: png)
 """
@@ -30,46 +31,84 @@ import json
 import os
 import re
 import sys
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
 
 import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # batch report: files only, no GUI
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba_array
+from matplotlib.patches import Patch
+
+# Fixed margins instead of tight_layout(), which needs an extra draw pass per figure
+plt.rcParams["figure.autolayout"] = False
+# Outcome charts are 8-18in wide: side margins are fixed in inches (y label plus 6-digit ticks)
+_OUTCOMES_SIDE_IN = (1.0, 0.16)
+_LINE_MARGINS = dict(left=0.08, right=0.95, top=0.93, bottom=0.1)  # room for scatter labels
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used instead
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
 
 # ----------------------------- I/O ------------------------------------ #
 
-def load_records(path: str) -> List[Dict[str, Any]]:
-    if path == "-":
-        return json.loads(sys.stdin.read())
-    with open(path, "r", encoding="utf-8") as f:
-        if path.lower().endswith(".jsonl"):
-            return [json.loads(line) for line in f if line.strip()]
-        return json.load(f)
+def _iter_jsonl(f) -> Iterator[Dict[str, Any]]:
+    with f:
+        for line in f:
+            if line.strip():
+                yield _json_loads(line)
+
+def _first_byte(f) -> bytes:
+    """First non-whitespace byte of a buffered binary file, without consuming it."""
+    while True:
+        head = f.peek(1)[:1]
+        if not head.isspace():
+            return head
+        f.read(1)
+
+def load_records(path: str) -> Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
+    """JSON arrays are decoded in one shot; anything else is read as JSON Lines, streamed lazily.
+    The format is told by content, not the file name."""
+    f = sys.stdin.buffer if path == "-" else open(path, "rb")
+    if _first_byte(f) == b"[":
+        with f:
+            return _json_loads(f.read())
+    return _iter_jsonl(f)
 
 _elapsed_re = re.compile(r"^\s*(\d+(?:\.\d+)?)(ns|ms|s|m)\s*$", re.IGNORECASE)
 
-def parse_elapsed_to_seconds(val: Any) -> float:
-    if val is None:
-        return float("nan")
-    if isinstance(val, (int, float)):
-        return float(val)
-    s = str(val).strip().lower()
-    m = _elapsed_re.match(s)
-    if not m:
-        return float("nan")
-    num = float(m.group(1)); unit = m.group(2)
-    if unit == "ns":
-        return num / 1_000_000_000.0
-    if unit == "ms":
-        return num / 1_000.0
-    if unit == "s":
-        return num
-    if unit == "m":
-        return num * 60.0
-    return float("nan")
-
-def normalize_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
-    df = pd.DataFrame(records)
+_ELAPSED_UNIT_SECONDS = {"ns": 1e-9, "ms": 1e-3, "s": 1.0, "m": 60.0}
+
+def elapsed_to_seconds(col: pd.Series) -> pd.Series:
+    """Elapsed times in seconds: human_elapsed() strings ("12ns", "64ms", "1.5s", "2m") are
+    converted by unit, plain numbers are taken as seconds, anything else becomes NaN.
+    Works column-wise, without a Python call per row."""
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype(float)
+    # human_elapsed() output repeats a lot ("64ms", ...): parse each distinct value once
+    codes, uniques = pd.factorize(col)
+    if len(uniques) == 0:
+        return pd.Series(np.nan, index=col.index, dtype=float)
+    secs = _parse_elapsed_values(pd.Series(uniques)).to_numpy()
+    return pd.Series(np.where(codes >= 0, secs[codes], np.nan), index=col.index)
+
+def _parse_elapsed_values(col: pd.Series) -> pd.Series:
+    parts = col.str.extract(_elapsed_re, expand=True)
+    nums = pd.to_numeric(parts[0], errors="coerce")
+    factor = parts[1].str.lower().map(_ELAPSED_UNIT_SECONDS)
+    secs = nums * factor
+    # Plain numbers mixed into an object column are already seconds
+    not_str = col.str.len().isna()
+    if not_str.any():
+        secs = secs.fillna(pd.to_numeric(col.where(not_str), errors="coerce"))
+    return secs.astype(float)
+
+def normalize_frame(records: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(records)
     defaults = {
         "root": "UNKNOWN",
         "ok": False,
@@ -79,51 +118,75 @@ def normalize_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
         "timeout": False,
         "elapsed": np.nan,
     }
-    for col, default in defaults.items():
-        if col not in df.columns:
-            df[col] = default
-
-    df["ok"] = df["ok"].astype(bool)
-    df["timeout"] = df["timeout"].astype(bool)
-    df["panicked"] = df["panicked"].astype(bool)
-    df["elapsed_sec"] = df["elapsed"].apply(parse_elapsed_to_seconds)
-
-    df["is_success"] = df["ok"]
-    df["is_timeout"] = (~df["ok"]) & (df["timeout"])
-    df["is_panicked"] = (~df["ok"]) & (df["panicked"])
-    df["is_otherfail"] = (~df["ok"]) & (~df["timeout"]) & (~df["panicked"])
+    missing = {col: default for col, default in defaults.items() if col not in df.columns}
+    if missing:
+        df = df.assign(**missing)
+
+    for c in ("ok", "timeout", "panicked"):
+        col = df[c]
+        if col.dtype == object:
+            # Mixed True/False/None: same truthiness rule as astype(bool)
+            df[c] = np.fromiter((bool(x) for x in col), dtype=bool, count=len(col))
+        elif col.dtype != bool:
+            df[c] = col.astype(bool)
+    df["elapsed_sec"] = elapsed_to_seconds(df["elapsed"])
+
+    ok = df["ok"].to_numpy(dtype=bool, copy=False)
+    timeout = df["timeout"].to_numpy(dtype=bool, copy=False)
+    panicked = df["panicked"].to_numpy(dtype=bool, copy=False)
+    not_ok = ~ok
+    df["is_success"] = ok
+    df["is_timeout"] = not_ok & timeout
+    df["is_panicked"] = not_ok & panicked
+    df["is_otherfail"] = not_ok & ~(timeout | panicked)
     return df
 
 # ----------------------------- Summary -------------------------------- #
 
+_OUTCOME_FLAGS = ["is_success", "is_timeout", "is_panicked", "is_otherfail"]
+
 def summarize(df: pd.DataFrame, group_fields: Sequence[str]) -> pd.DataFrame:
-    g = df.groupby([df[f].fillna("NA") for f in group_fields], dropna=False)
-    summary = pd.DataFrame({
-        "jobs": g.size(),
-        "successes": g["is_success"].sum(),
-        "timeouts": g["is_timeout"].sum(),
-        "panicked": g["is_panicked"].sum(),
-        "other_fail": g["is_otherfail"].sum(),
-        "success_rate_%": (g["is_success"].mean() * 100.0),
-        "p50_elapsed_s": g["elapsed_sec"].median(),
-        "p95_elapsed_s": g["elapsed_sec"].quantile(0.95),
-    }).reset_index()
-    summary = summary.rename(columns={f: f for f in group_fields})
-    summary = summary.sort_values(by=["jobs", "success_rate_%"], ascending=[False, False])
-    for c in ["success_rate_%", "p50_elapsed_s", "p95_elapsed_s"]:
-        summary[c] = summary[c].round(3)
+    # uint8 flags hit the integer sum kernel rather than the bool one
+    data = df[_OUTCOME_FLAGS].astype(np.uint8)
+    data["elapsed_sec"] = df["elapsed_sec"]
+    g = data.groupby([df[f].fillna("NA") for f in group_fields], dropna=False)
+    summary = g.agg(
+        jobs=("is_success", "size"),
+        successes=("is_success", "sum"),
+        timeouts=("is_timeout", "sum"),
+        panicked=("is_panicked", "sum"),
+        other_fail=("is_otherfail", "sum"),
+        p50_elapsed_s=("elapsed_sec", "median"),
+    )
+    counts = ["successes", "timeouts", "panicked", "other_fail"]
+    summary[counts] = summary[counts].astype(np.int64)
+    # Grouped quantile has its own Cython kernel; a lambda in agg would not
+    summary["p95_elapsed_s"] = g["elapsed_sec"].quantile(0.95)
+    summary.insert(5, "success_rate_%", summary["successes"] / summary["jobs"] * 100.0)
+    summary = summary.reset_index().sort_values(by=["jobs", "success_rate_%"], ascending=[False, False])
+    rounded = ["success_rate_%", "p50_elapsed_s", "p95_elapsed_s"]
+    summary[rounded] = summary[rounded].round(3)
     return summary
 
 # ------------------------------ Charts --------------------------------- #
 
-def _labels_from_row(row: pd.Series, pref: str) -> str:
-    # Pick preferred field, else fallbacks
+def _labels_from_frame(d: pd.DataFrame, pref: str) -> pd.Series:
+    # Pick preferred field, else fallbacks; first non-blank string wins per row
     candidates = [pref, "alethe", "slice", "out"]
+    lab = pd.Series(None, index=d.index, dtype=object)
     for c in candidates:
-        if c in row and isinstance(row[c], str) and row[c].strip():
-            base = os.path.basename(row[c])
-            return base
-    return "(unknown)"
+        if c not in d.columns:
+            continue
+        col = d[c]
+        if not (col.dtype == object or pd.api.types.is_string_dtype(col)):
+            continue
+        lab = lab.fillna(col.where(col.str.strip().str.len() > 0))
+    return lab.str.rsplit(os.sep, n=1).str[-1].fillna("(unknown)")
+
+def _outcomes_margins(fig) -> Dict[str, float]:
+    width = fig.get_size_inches()[0]
+    left_in, right_in = _OUTCOMES_SIDE_IN
+    return dict(left=left_in / width, right=1 - right_in / width, top=0.93, bottom=0.1)
 
 def plot_outcomes_stacked(summary: pd.DataFrame,
                           group_fields: Sequence[str],
@@ -146,10 +209,12 @@ def plot_outcomes_stacked(summary: pd.DataFrame,
     c_other = s["other_fail"].to_numpy()
 
     fig, ax = plt.subplots(figsize=(max(8, min(18, 1.2 * len(labels))), 6))
-    ax.bar(x, c_success, width, label="Success")
-    ax.bar(x, c_timeout, width, bottom=c_success, label="Timeout")
-    ax.bar(x, c_panicked, width, bottom=c_success + c_timeout, label="Panicked")
-    ax.bar(x, c_other, width, bottom=c_success + c_timeout + c_panicked, label="Other fail")
+    # One running bottom shared by all layers; bar() copies it on each call
+    bottom = np.zeros(len(labels), dtype=np.int64)
+    for y, title in ((c_success, "Success"), (c_timeout, "Timeout"),
+                     (c_panicked, "Panicked"), (c_other, "Other fail")):
+        ax.bar(x, y, width, bottom=bottom, label=title)
+        np.add(bottom, y, out=bottom)
 
     ax.set_title("Outcomes by group (stacked)")
     ax.set_xlabel(" / ".join(group_fields))
@@ -159,7 +224,7 @@ def plot_outcomes_stacked(summary: pd.DataFrame,
 
     os.makedirs(out_path, exist_ok=True)
     out_file = os.path.join(out_path, f"proof_outcomes_stacked.{img_fmt}")
-    fig.tight_layout()
+    fig.subplots_adjust(**_outcomes_margins(fig))
     fig.savefig(out_file, dpi=160)
     plt.close(fig)
     return out_file
@@ -186,27 +251,35 @@ def plot_outcomes_grouped(summary: pd.DataFrame,
     m = len(series)
     width = 0.8 / m
 
+    # One bar call for every (group, outcome) pair, laid out series-major
+    ys = np.column_stack([s[col].to_numpy() for col, _ in series])
+    offsets = (np.arange(m) - (m-1)/2) * width
+    xs = x[:, None] + offsets[None, :]
+    palette = to_rgba_array(plt.rcParams["axes.prop_cycle"].by_key()["color"][:m])
+
     fig, ax = plt.subplots(figsize=(max(8, min(18, 1.2 * len(labels))), 6))
-    for i, (col, title) in enumerate(series):
-        y = s[col].to_numpy()
-        ax.bar(x + (i - (m-1)/2) * width, y, width, label=title)
+    ax.bar(xs.ravel(order="F"), ys.ravel(order="F"), width,
+           color=np.repeat(palette, len(x), axis=0))
+    handles = [Patch(facecolor=c, label=title) for c, (_, title) in zip(palette, series)]
 
     ax.set_title("Outcomes by group (grouped)")
     ax.set_xlabel(" / ".join(group_fields))
     ax.set_ylabel("count")
     ax.set_xticks(x, labels)
-    ax.legend(ncols=min(4, m))
+    ax.legend(handles=handles, ncols=min(4, m))
 
     os.makedirs(out_path, exist_ok=True)
     out_file = os.path.join(out_path, f"proof_outcomes_grouped.{img_fmt}")
-    fig.tight_layout()
+    fig.subplots_adjust(**_outcomes_margins(fig))
     fig.savefig(out_file, dpi=160)
     plt.close(fig)
     return out_file
 
 def plot_time_per_entries(df: pd.DataFrame, out_path: str, img_fmt: str = "png") -> str:
     """Inverse-CDF / rank plot: y=time, x=number of entries."""
-    times = df["elapsed_sec"].dropna().to_numpy()
+    raw = df["elapsed_sec"].to_numpy(dtype=float)
+    # Boolean indexing already copies, so the in-place sort never touches df's buffer
+    times = raw[~np.isnan(raw)]
     if times.size == 0:
         times = np.array([0.0])
     times.sort()
@@ -220,7 +293,7 @@ def plot_time_per_entries(df: pd.DataFrame, out_path: str, img_fmt: str = "png")
 
     os.makedirs(out_path, exist_ok=True)
     out_file = os.path.join(out_path, f"time_per_entries.{img_fmt}")
-    fig.tight_layout()
+    fig.subplots_adjust(**_LINE_MARGINS)
     fig.savefig(out_file, dpi=160)
     plt.close(fig)
     return out_file
@@ -229,10 +302,12 @@ def plot_scatter_entries(df: pd.DataFrame,
                          out_path: str,
                          img_fmt: str = "png",
                          sample_size: int = 1000,
-                         label_field: str = "smt2") -> str:
+                         label_field: str = "smt2",
+                         annotate_k: int = 20) -> str:
     """
-    Scatter plot where each point is an entry (random sample up to sample_size),
-    labeled with the file name only (basename). Coordinates:
+    Scatter plot where each point is an entry (up to sample_size, evenly spaced by rank).
+    The annotate_k fastest and annotate_k slowest entries are labeled with the
+    file name only (basename); annotate_k=0 labels every point. Coordinates:
       x = entry rank after sorting by elapsed_sec (fastest→slowest)
       y = elapsed_sec
     """
@@ -246,34 +321,45 @@ def plot_scatter_entries(df: pd.DataFrame,
         ax.set_ylabel("elapsed time (seconds)")
         os.makedirs(out_path, exist_ok=True)
         out_file = os.path.join(out_path, f"entries_scatter.{img_fmt}")
-        fig.tight_layout(); fig.savefig(out_file, dpi=160); plt.close(fig)
+        fig.subplots_adjust(**_LINE_MARGINS); fig.savefig(out_file, dpi=160); plt.close(fig)
         return out_file
 
-    # Random sample (reproducible)
-    if sample_size and len(d) > sample_size:
-        d = d.sample(n=sample_size, random_state=42)
-
-    # Sort by time to define rank
-    d = d.sort_values("elapsed_sec", kind="mergesort").reset_index(drop=True)
-    d["rank"] = np.arange(1, len(d) + 1)
-    d["label"] = d.apply(lambda r: _labels_from_row(r, label_field), axis=1)
+    # Sort by time to define rank, then keep sample_size rank-uniform entries
+    # (fastest and slowest included) so the whole elapsed range stays visible
+    order = np.argsort(d["elapsed_sec"].to_numpy(), kind="stable")
+    ranks = np.arange(1, len(order) + 1)
+    if sample_size and len(order) > sample_size:
+        picked = np.linspace(0, len(order) - 1, sample_size).astype(np.intp)
+        order, ranks = order[picked], ranks[picked]
+    d = d.iloc[order].reset_index(drop=True)
+    d["rank"] = ranks
 
     fig, ax = plt.subplots(figsize=(12, 7))
     ax.scatter(d["rank"], d["elapsed_sec"], s=12, alpha=0.9)
 
-    # Annotate every sampled point with its filename (basename)
-    for _, r in d.iterrows():
-        ax.annotate(r["label"], (r["rank"], r["elapsed_sec"]),
+    # Annotate only the extremes: past a few dozen labels the text overlaps
+    # and the per-artist text layout dominates savefig time
+    if annotate_k and len(d) > 2 * annotate_k:
+        ann = pd.concat([d.head(annotate_k), d.tail(annotate_k)])
+        title = f"Entries scatter (n={len(d)}) — {annotate_k} fastest/slowest labeled by file name"
+    else:
+        ann = d
+        title = f"Entries scatter (n={len(d)}) — labeled by file name"
+    labels = _labels_from_frame(ann, label_field).to_numpy(dtype=object)
+    ranks = ann["rank"].to_numpy()
+    ys = ann["elapsed_sec"].to_numpy()
+    for i in range(len(labels)):
+        ax.annotate(labels[i], (ranks[i], ys[i]),
                     textcoords="offset points", xytext=(2, 2),
                     fontsize=7, ha="left", va="bottom")
 
-    ax.set_title(f"Entries scatter (n={len(d)}) — labeled by file name")
+    ax.set_title(title)
     ax.set_xlabel("entry rank (by elapsed, fastest → slowest)")
     ax.set_ylabel("elapsed time (seconds)")
 
     os.makedirs(out_path, exist_ok=True)
     out_file = os.path.join(out_path, f"entries_scatter.{img_fmt}")
-    fig.tight_layout()
+    fig.subplots_adjust(**_LINE_MARGINS)
     fig.savefig(out_file, dpi=160)
     plt.close(fig)
     return out_file
@@ -290,7 +376,9 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     p.add_argument("--chart", choices=("stacked", "grouped"), default="grouped",
                    help="Outcomes chart style. Default: grouped.")
     p.add_argument("--scatter-sample", type=int, default=1000,
-                   help="Max number of entries to label in the scatter. Default: 1000")
+                   help="Max number of entries to plot in the scatter. Default: 1000")
+    p.add_argument("--scatter-labels", type=int, default=20,
+                   help="Label only the N fastest and N slowest scatter entries (0 labels all). Default: 20")
     p.add_argument("--label-field", default="smt2",
                    help="Field for file labels (fallbacks: alethe, slice, out). Default: smt2")
     return p.parse_args(argv)
@@ -300,14 +388,14 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
 
     try:
         records = load_records(args.input)
+        if not isinstance(records, (list, Iterator)):
+            print("[ERROR] Input must be a JSON list.", file=sys.stderr)
+            return 2
+        # JSONL records are decoded lazily, so parse errors surface here
+        df = normalize_frame(records)
     except Exception as e:
         print(f"[ERROR] Failed to load input: {e}", file=sys.stderr)
         return 2
-    if not isinstance(records, list):
-        print("[ERROR] Input must be a JSON list.", file=sys.stderr)
-        return 2
-
-    df = normalize_frame(records)
 
     group_fields = [s.strip() for s in args.group_by.split(",") if s.strip()] or ["root"]
     summary = summarize(df, group_fields)
@@ -329,10 +417,11 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
     # Rank line plot
     rank_path = plot_time_per_entries(df, args.out_dir, img_fmt=args.img_fmt)
 
-    # Scatter with labels (random sample up to N)
+    # Scatter of up to N entries evenly spaced by rank; the fastest and slowest K are labeled
     scatter_path = plot_scatter_entries(df, args.out_dir, img_fmt=args.img_fmt,
                                         sample_size=args.scatter_sample,
-                                        label_field=args.label_field)
+                                        label_field=args.label_field,
+                                        annotate_k=args.scatter_labels)
 
     # Console summary
     total_jobs = int(summary["jobs"].sum())
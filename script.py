@@ -1,16 +1,37 @@
 #!/usr/bin/env python3
 import argparse
 import json
+import mmap
 import os
 import re
 import shutil
 import subprocess
 import sys
+import threading
 import time
-from typing import Iterable, List, Tuple, Optional
-
-STEP_NAME_RE = re.compile(r"\(step\s+([^\s\)]+)")
-HOLE_MARKER = "TRUST_THEORY_REWRITE"
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used instead
+    orjson = None
+
+STEP_NAME_RE = re.compile(rb"\(step\s+([^\s\)]+)")
+HOLE_MARKER = b"TRUST_THEORY_REWRITE"
+INDEX_NAME = ".proof_slice.index.json"
+# Everything run_elaborate reads out of a carcara log, tallied in one pass
+LOG_MARKER_RE = re.compile(rb"Elaboration successed|Check failed:|panicked at")
+LOG_MARKER_OVERLAP = len(b"Elaboration successed") - 1
+LOG_CHUNK_SIZE = 64 * 1024
+LOG_DRAIN_GRACE_SEC = 2
+
+def dump_json(obj) -> str:
+    """One-line JSON (non-ASCII kept as UTF-8), via orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
 
 def human_elapsed(ns: int) -> str:
     if ns < 1_000_000:
@@ -21,28 +42,45 @@ def human_elapsed(ns: int) -> str:
         return f"{ns/1_000_000_000:.2f}s"
     return f"{ns/60_000_000_000:.2f}m"
 
-def read_file_lines(path: str) -> Iterable[Tuple[int, str]]:
-    with open(path, "r", encoding="utf-8", errors="ignore") as fh:
-        for i, line in enumerate(fh, start=1):
-            yield i, line
+def _count_newlines(chunk: bytes, has_cr: bool) -> int:
+    # Universal newlines, as text-mode reading counted them: \n, \r\n and lone \r
+    n = chunk.count(b"\n")
+    if has_cr:
+        n += chunk.count(b"\r") - chunk.count(b"\r\n")
+    return n
 
 def holes_in_alethe(path: str) -> List[Tuple[str, int]]:
+    """First-seen (step name, line) per TRUST_THEORY_REWRITE line, skipping subproof steps."""
     holes: List[Tuple[str, int]] = []
-    for lineno, line in read_file_lines(path):
-        if HOLE_MARKER in line:
-            m = STEP_NAME_RE.search(line)
-            if m:
-                name = m.group(1)
-                if "." in name:
-                    continue
-                holes.append((name, lineno))
     seen = set()
-    uniq: List[Tuple[str, int]] = []
-    for h in holes:
-        if h[0] not in seen:
-            seen.add(h[0])
-            uniq.append(h)
-    return uniq
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return holes
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            has_cr = mm.find(b"\r") != -1
+            # Jump between marker hits; newlines are only counted up to each hit
+            lineno, counted = 1, 0
+            pos = mm.find(HOLE_MARKER)
+            while pos != -1:
+                start = mm.rfind(b"\n", 0, pos) + 1
+                end = mm.find(b"\n", pos)
+                if end == -1:
+                    end = len(mm)
+                if has_cr:
+                    start = max(start, mm.rfind(b"\r", start, pos) + 1)
+                    cr = mm.find(b"\r", pos, end)
+                    if cr != -1:
+                        end = cr
+                lineno += _count_newlines(mm[counted:start], has_cr)
+                counted = start
+                m = STEP_NAME_RE.search(mm, start, end)
+                if m:
+                    name = m.group(1).decode("utf-8", errors="ignore")
+                    if "." not in name and name not in seen:
+                        seen.add(name)
+                        holes.append((name, lineno))
+                pos = mm.find(HOLE_MARKER, end)
+    return holes
 
 def rel_to(root: str, path: str) -> str:
     try:
@@ -50,48 +88,57 @@ def rel_to(root: str, path: str) -> str:
     except Exception:
         return path
 
+# Directories are only ever created during a run, so a cached entry never goes stale
+_created_dirs: Set[str] = set()
+
 def ensure_dir(p: str) -> None:
-    os.makedirs(p, exist_ok=True)
-
-def append_json_array(path: str, entry: dict) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    if not os.path.exists(path):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump([entry], f, ensure_ascii=False, indent=2)
-            f.write("\n")
+    if p not in _created_dirs:
+        os.makedirs(p, exist_ok=True)
+        _created_dirs.add(p)
+
+def iter_alethe_files(root: str) -> Iterator[Tuple[str, "os.DirEntry[str]"]]:
+    """Yield (dirpath, entry) for each *.smt2.alethe file under root in os.walk's top-down order;
+    like os.walk, symlinked dirs are not followed."""
+    stack = [root]
+    while stack:
+        dirpath = stack.pop()
+        try:
+            it = os.scandir(dirpath)
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.endswith(".smt2.alethe") and entry.is_file():
+                    yield dirpath, entry
+        stack.extend(reversed(subdirs))
+
+def append_jsonl(path: str, line: str) -> None:
+    ensure_dir(os.path.dirname(path))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+def ensure_jsonl(path: str) -> None:
+    """Rewrite a results file still holding a JSON array (the old format) as JSON Lines."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = f.read()
+    except FileNotFoundError:
         return
-    with open(path, "rb+") as f:
-        f.seek(0, os.SEEK_END)
-        if f.tell() == 0:
-            f.write(json.dumps([entry], ensure_ascii=False, indent=2).encode("utf-8"))
-            f.write(b"\n")
-            return
-        step = 1024
-        size = f.tell()
-        pos = max(0, size - step)
-        f.seek(pos)
-        chunk = f.read().decode("utf-8", errors="ignore")
-        while "]" not in chunk and pos > 0:
-            pos = max(0, pos - step)
-            f.seek(pos)
-            chunk = f.read(min(step, pos + step)).decode("utf-8", errors="ignore") + chunk
-        last_bracket = chunk.rfind("]")
-        if last_bracket == -1:
-            f.seek(0)
-            try:
-                existing = json.load(f) or []
-            except Exception:
-                existing = []
-            existing.append(entry)
-            f.seek(0)
-            f.truncate()
-            json.dump(existing, f, ensure_ascii=False, indent=2)
-            f.write("\n".encode("utf-8"))
-            return
-        abs_pos = pos + last_bracket
-        f.seek(abs_pos)
-        tail = ",\n" + json.dumps(entry, ensure_ascii=False, indent=2) + "\n]"
-        f.write(tail.encode("utf-8"))
+    start = len(data) - len(data.lstrip())
+    if not data.startswith("[", start):
+        return
+    records, end = json.JSONDecoder().raw_decode(data, start)
+    if not isinstance(records, list):
+        raise ValueError("top-level JSON is not an array")
+    # Keep lines that were appended after the array's closing bracket
+    records.extend(json.loads(line) for line in data[end:].splitlines() if line.strip())
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(dump_json(r) + "\n" for r in records)
+    os.replace(tmp, path)
 
 def find_smt2_beside(alethe: str) -> Optional[str]:
     if alethe.endswith(".smt2.alethe"):
@@ -103,10 +150,6 @@ def find_smt2_beside(alethe: str) -> Optional[str]:
         return cand if os.path.isfile(cand) else None
     return None
 
-def find_existing_smt2_for_base(out_dir: str, base_name: str) -> Optional[str]:
-    cand = os.path.join(out_dir, f"{base_name}.smt2")
-    return cand if os.path.isfile(cand) else None
-
 def run_slice(from_hole: str, alethe_path: str, smt2_path: str, out_slice_path: str,
               parse_hole_args: bool, no_print_with_sharing: bool, debug: bool) -> Tuple[bool, Optional[str]]:
     ensure_dir(os.path.dirname(out_slice_path))
@@ -121,7 +164,7 @@ def run_slice(from_hole: str, alethe_path: str, smt2_path: str, out_slice_path:
     if no_print_with_sharing:
         cmd.append("--no-print-with-sharing")
     if debug:
-        print(json.dumps({"debug": "slice_cmd", "cmd": cmd, "out": out_slice_path}))
+        print(dump_json({"debug": "slice_cmd", "cmd": cmd, "out": out_slice_path}))
     stderr_path = out_slice_path + ".stderr"
     with open(out_slice_path, "w", encoding="utf-8") as f_out, open(stderr_path, "w", encoding="utf-8") as f_err:
         proc = subprocess.run(cmd, stdout=f_out, stderr=f_err, text=True)
@@ -134,6 +177,23 @@ def run_slice(from_hole: str, alethe_path: str, smt2_path: str, out_slice_path:
         pass
     return True, None
 
+def pump_log(stream, f_log, counts: Counter, errors: List[BaseException]) -> None:
+    """Copy a carcara output pipe into its log file, tallying LOG_MARKER_RE hits as chunks arrive."""
+    tail = b""
+    try:
+        while True:
+            chunk = stream.read(LOG_CHUNK_SIZE)
+            if not chunk:
+                break
+            f_log.write(chunk)
+            # Re-scan the previous chunk's tail so markers split across reads are seen;
+            # hits that end inside the tail were already counted
+            buf = tail + chunk
+            counts.update(m.group(0) for m in LOG_MARKER_RE.finditer(buf) if m.end() > len(tail))
+            tail = buf[-LOG_MARKER_OVERLAP:]
+    except Exception as e:
+        errors.append(e)
+
 def run_elaborate(slice_path: str, smt2_path: str, out_log_path: str, rare_file: str,
                   allow_int_real: bool, add_pipeline: bool, no_print_with_sharing: bool,
                   parse_hole_args: bool, timeout_sec: int) -> Tuple[bool, int, int, bool, int, bool]:
@@ -160,45 +220,228 @@ def run_elaborate(slice_path: str, smt2_path: str, out_log_path: str, rare_file:
 
     start_ns = time.monotonic_ns()
     timed_out = False
-    with open(out_log_path, "w", encoding="utf-8") as f_log:
+    counts: Counter = Counter()
+    pump_errors: List[BaseException] = []
+    with open(out_log_path, "wb") as f_log:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0)
+        # The log is written and tallied while carcara runs, so it is never read back
+        pump = threading.Thread(target=pump_log, args=(proc.stdout, f_log, counts, pump_errors), daemon=True)
+        pump.start()
         try:
-            subprocess.run(
-                cmd,
-                stdout=f_log,
-                stderr=subprocess.STDOUT,
-                text=True,
-                timeout=(None if timeout_sec is None or timeout_sec <= 0 else timeout_sec),
-            )
+            proc.wait(timeout=(None if timeout_sec is None or timeout_sec <= 0 else timeout_sec))
         except subprocess.TimeoutExpired:
             timed_out = True
+            proc.kill()
+            proc.wait()
+        end_ns = time.monotonic_ns()
+        # After a kill, anything carcara spawned may still hold the pipe open; don't wait on it
+        pump.join(timeout=(LOG_DRAIN_GRACE_SEC if timed_out else None))
+        if not pump.is_alive():
+            proc.stdout.close()
+        if timed_out:
             # Leave a clear marker in the log
             try:
-                f_log.write(f"\n[timeout] Elaboration exceeded {timeout_sec}s and was terminated.\n")
+                f_log.write(f"\n[timeout] Elaboration exceeded {timeout_sec}s and was terminated.\n".encode("utf-8"))
             except Exception:
                 pass
-    end_ns = time.monotonic_ns()
     elapsed_ns = end_ns - start_ns
 
-    # Parse the log
-    ok = True
-    success = 0
-    failed = 0
-    panicked = False
-    try:
-        with open(out_log_path, "r", encoding="utf-8", errors="ignore") as f:
-            data = f.read()
-        success = data.count("Elaboration successed")
-        failed  = data.count("Check failed:")
-        if "panicked at" in data:
-            panicked = True
-    except Exception:
-        ok = False
+    ok = not pump_errors
+    success = counts[b"Elaboration successed"]
+    failed  = counts[b"Check failed:"]
+    panicked = counts[b"panicked at"] > 0
 
     if timed_out or panicked or failed > 0:
         ok = False
 
     return ok, success, failed, panicked, elapsed_ns, timed_out
 
+def load_index(path: str) -> Dict[str, dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+def save_index(path: str, index: Dict[str, dict]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(dump_json(index))
+    os.replace(tmp, path)
+
+def process_alethe(alethe_path: str, dirpath: str, args: argparse.Namespace, root_abs: str,
+                   root_name: str, out_root_parent: str, sliced_root: str,
+                   emit: Callable[[str, bool], None], stop: threading.Event,
+                   indexed: Optional[dict] = None) -> Optional[dict]:
+    """
+    Slice and elaborate every hole of one .smt2.alethe file.
+    Each JSON line goes to `emit` as soon as it exists, flagged with whether it is a
+    result to append; no new hole is started once `stop` is set.
+    `indexed` is this file's entry from the previous run's index ({"mtime_ns", "holes"}).
+    Returns the index entry to keep for this file (None when its .smt2 is missing or
+    the run was stopped before every hole was done).
+    """
+    rel_dir = os.path.relpath(dirpath, root_abs)
+    base_name = os.path.splitext(os.path.basename(alethe_path[:-7]))[0]
+
+    out_dir = os.path.join(sliced_root, root_name, rel_dir, base_name)
+    ensure_dir(out_dir)
+    # One listing answers every "already there?" question below
+    with os.scandir(out_dir) as it:
+        existing = {e.name for e in it if e.is_file()}
+
+    def cached_line(hole_name: str) -> str:
+        return dump_json({
+            "status": "ok",
+            "cached": True,
+            "root": root_name,
+            "alethe": rel_to(root_abs, alethe_path),
+            "hole": hole_name,
+            "slice": rel_to(out_root_parent, os.path.join(out_dir, f"{base_name}__from-{hole_name}.smt2.alethe")),
+            "out": rel_to(out_root_parent, os.path.join(out_dir, f"{base_name}__from-{hole_name}.out"))
+        })
+
+    # Unchanged since the last run: reuse its hole list instead of rescanning the proof,
+    # and if every hole is already sliced and elaborated there is nothing left to do
+    mtime_ns = os.stat(alethe_path).st_mtime_ns
+    holes: Optional[List[Tuple[str, int]]] = None
+    if indexed is not None and indexed.get("mtime_ns") == mtime_ns:
+        holes = [(name, line_no) for name, line_no in indexed.get("holes", [])]
+        if args.debug:
+            emit(dump_json({"debug":"holes", "alethe": rel_to(root_abs, alethe_path), "count": len(holes), "indexed": True}), False)
+        if all(f"{base_name}__from-{h}.smt2.alethe" in existing and f"{base_name}__from-{h}.out" in existing
+               for h, _ in holes):
+            for h, _ in holes:
+                emit(cached_line(h), False)
+            return indexed
+
+    smt2_src = find_smt2_beside(alethe_path)
+    smt2_name = f"{base_name}.smt2"
+    # The .smt2 inside out_dir, once it exists; this task is the only one that places it
+    smt2_placed = os.path.join(out_dir, smt2_name) if smt2_name in existing else None
+
+    if smt2_placed:
+        smt2_for_slice = smt2_placed
+    elif smt2_src and os.path.isfile(smt2_src):
+        smt2_for_slice = smt2_src
+    else:
+        guessed = os.path.join(dirpath, smt2_name)
+        if os.path.isfile(guessed):
+            smt2_for_slice = guessed
+        else:
+            emit(dump_json({
+                "status":"not_found",
+                "reason":"matching .smt2 not found",
+                "alethe": rel_to(root_abs, alethe_path)
+            }), False)
+            return None
+
+    if holes is None:
+        holes = holes_in_alethe(alethe_path)
+        if args.debug:
+            emit(dump_json({"debug":"holes", "alethe": rel_to(root_abs, alethe_path), "count": len(holes)}), False)
+
+    for hole_name, line_no in holes:
+        if stop.is_set():
+            return None
+        slice_name = f"{base_name}__from-{hole_name}.smt2.alethe"
+        slice_path = os.path.join(out_dir, slice_name)
+        out_log_name = f"{base_name}__from-{hole_name}.out"
+        out_log_path = os.path.join(out_dir, out_log_name)
+        # carcara logs here; it becomes the cached .out only once its result line is recorded
+        tmp_log_path = out_log_path + ".tmp"
+
+        slice_cached = slice_name in existing
+        if not slice_cached:
+            ok_slice, stderr_path = run_slice(
+                from_hole=hole_name,
+                alethe_path=alethe_path,
+                smt2_path=smt2_for_slice,
+                out_slice_path=slice_path,
+                parse_hole_args=args.parse_hole_args,
+                no_print_with_sharing=args.no_print_with_sharing,
+                debug=args.debug
+            )
+            if not ok_slice:
+                emit(dump_json({
+                    "status":"slice_error",
+                    "alethe": rel_to(root_abs, alethe_path),
+                    "hole": hole_name,
+                    "line": line_no,
+                    "stderr": rel_to(out_root_parent, stderr_path) if stderr_path else None
+                }), False)
+                continue
+
+        if not smt2_placed:
+            if not smt2_src or not os.path.isfile(smt2_src):
+                if os.path.isfile(smt2_for_slice):
+                    smt2_src = smt2_for_slice
+            target = os.path.join(out_dir, smt2_name)
+            if smt2_src and os.path.isfile(smt2_src):
+                if args.no_move:
+                    shutil.copy2(smt2_src, target)
+                    moved_action = "copied"
+                else:
+                    try:
+                        shutil.move(smt2_src, target)
+                        moved_action = "moved"
+                    except shutil.Error:
+                        shutil.copy2(smt2_src, target)
+                        try:
+                            os.remove(smt2_src)
+                        except OSError:
+                            pass
+                        moved_action = "moved_copy"
+                if args.debug:
+                    emit(dump_json({"debug":"smt2_transfer", "action": moved_action, "to": rel_to(out_root_parent, target)}), False)
+                smt2_placed = target
+        smt2_dest = smt2_placed or smt2_for_slice
+
+        elaborate_cached = out_log_name in existing
+        if elaborate_cached:
+            emit(cached_line(hole_name), False)
+            continue
+
+        ok, succ, fail, pan, elapsed_ns, timed_out = run_elaborate(
+            slice_path=slice_path,
+            smt2_path=smt2_dest,
+            out_log_path=tmp_log_path,
+            rare_file=args.rare_file,
+            allow_int_real=args.allow_int_real_subtyping,
+            add_pipeline=args.pipeline_hole_local,
+            no_print_with_sharing=args.no_print_with_sharing,
+            parse_hole_args=args.parse_hole_args,
+            timeout_sec=args.elab_timeout_sec,
+        )
+        if stop.is_set():
+            # Interrupted mid-run (Ctrl-C reaches carcara too): drop the partial log
+            try:
+                os.remove(tmp_log_path)
+            except OSError:
+                pass
+            return None
+
+        result = {
+            "root": root_name,
+            "alethe": rel_to(root_abs, alethe_path),
+            "hole": hole_name,
+            "line": line_no,
+            "slice": rel_to(out_root_parent, slice_path),
+            "smt2": rel_to(out_root_parent, smt2_dest) if smt2_dest else None,
+            "out": rel_to(out_root_parent, out_log_path),
+            "ok": ok,
+            "success": succ,
+            "failed": fail,
+            "panicked": pan,
+            "timeout": timed_out,
+            "elapsed": human_elapsed(elapsed_ns),
+        }
+        emit(dump_json(result), True)
+        os.replace(tmp_log_path, out_log_path)
+
+    return {"mtime_ns": mtime_ns, "holes": [list(h) for h in holes]}
+
 def main():
     ap = argparse.ArgumentParser(
         description="Incrementally slice 'Theory rewrite' holes and elaborate them with Carcara."
@@ -206,8 +449,11 @@ def main():
     ap.add_argument("root", nargs="?", default=".", help="Root folder to scan for *.smt2.alethe files (default: .)")
     ap.add_argument("--out-root", default=None, help="Base dir to write 'sliced_proofs'. Default: alongside ROOT (parent of ROOT).")
     ap.add_argument("--rare-file", default="big.rare", help="Path to .rare file (default: big.rare)")
-    ap.add_argument("--results", default="results.json", help="JSON array file to append per-slice elaboration results (default: results.json)")
+    ap.add_argument("--results", default="results.jsonl", help="JSON Lines file to append per-slice elaboration results; an existing JSON array file is converted first (default: results.jsonl)")
     ap.add_argument("--elab-timeout-sec", type=int, default=60, help="Timeout in seconds for each elaboration (0 disables). Default: 60")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Number of .alethe files processed concurrently (default: 1). Concurrent elaborations "
+                         "compete for CPU, so 'elapsed' and --elab-timeout-sec cutoffs then depend on machine load.")
     ap.add_argument("--debug", action="store_true", help="Verbose debug output")
     ap.add_argument("--no-move", action="store_true", help="Do not move the original .smt2 (copy instead).")
     # Defaults reflect your benchmark flags
@@ -225,142 +471,58 @@ def main():
     root_name = os.path.basename(root_abs.rstrip(os.sep))
     out_root_parent = os.path.abspath(args.out_root) if args.out_root else os.path.abspath(os.path.join(root_abs, ".."))
     sliced_root = os.path.join(out_root_parent, "sliced_proofs")
+    results_path = os.path.join(out_root_parent, args.results)
+    # Results are appended as JSON Lines whatever the file is called
+    try:
+        ensure_jsonl(results_path)
+    except ValueError as e:
+        print(f"error: cannot convert {results_path} to JSON Lines: {e}", file=sys.stderr)
+        sys.exit(1)
     ensure_dir(sliced_root)
+    # alethe path -> {"mtime_ns", "holes"}; lets reruns skip unchanged, fully processed files
+    index_path = os.path.join(sliced_root, INDEX_NAME)
+    index = load_index(index_path)
 
     if args.debug:
-        print(json.dumps({"debug": "paths", "root": root_abs, "sliced_root": sliced_root}))
-
-    for dirpath, _dirnames, filenames in os.walk(root_abs):
-        for fname in filenames:
-            if not fname.endswith(".smt2.alethe"):
-                continue
+        print(dump_json({"debug": "paths", "root": root_abs, "sliced_root": sliced_root}))
 
-            alethe_path = os.path.join(dirpath, fname)
-            rel_dir = os.path.relpath(dirpath, root_abs)
-            base_name = os.path.splitext(os.path.basename(alethe_path[:-7]))[0]
+    # Lines are printed and results appended the moment a worker has them, so a run that
+    # stops partway still records every hole whose .out log it left behind
+    output_lock = threading.Lock()
 
-            out_dir = os.path.join(sliced_root, root_name, rel_dir, base_name)
-            ensure_dir(out_dir)
+    def emit(line: str, is_result: bool) -> None:
+        with output_lock:
+            print(line)
+            if is_result:
+                append_jsonl(results_path, line)
 
-            smt2_src = find_smt2_beside(alethe_path)
-            smt2_dest = find_existing_smt2_for_base(out_dir, base_name)
-
-            if smt2_dest:
-                smt2_for_slice = smt2_dest
-            elif smt2_src and os.path.isfile(smt2_src):
-                smt2_for_slice = smt2_src
-            else:
-                guessed = os.path.join(dirpath, f"{base_name}.smt2")
-                if os.path.isfile(guessed):
-                    smt2_for_slice = guessed
-                else:
-                    print(json.dumps({
-                        "status":"not_found",
-                        "reason":"matching .smt2 not found",
-                        "alethe": rel_to(root_abs, alethe_path)
-                    }))
-                    continue
-
-            holes = holes_in_alethe(alethe_path)
-            if args.debug:
-                print(json.dumps({"debug":"holes", "alethe": rel_to(root_abs, alethe_path), "count": len(holes)}))
-
-            for hole_name, line_no in holes:
-                slice_name = f"{base_name}__from-{hole_name}.smt2.alethe"
-                slice_path = os.path.join(out_dir, slice_name)
-                out_log_path = os.path.join(out_dir, f"{base_name}__from-{hole_name}.out")
-
-                slice_cached = os.path.exists(slice_path)
-                if not slice_cached:
-                    ok_slice, stderr_path = run_slice(
-                        from_hole=hole_name,
-                        alethe_path=alethe_path,
-                        smt2_path=smt2_for_slice,
-                        out_slice_path=slice_path,
-                        parse_hole_args=args.parse_hole_args,
-                        no_print_with_sharing=args.no_print_with_sharing,
-                        debug=args.debug
+    # Work happens in carcara subprocesses, so threads are enough to keep the requested cores busy.
+    # Holes of one file stay in one task: they share the .smt2 that the first slice moves.
+    stop = threading.Event()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+            try:
+                futures = {}
+                for dirpath, entry in iter_alethe_files(root_abs):
+                    fut = executor.submit(
+                        process_alethe, entry.path, dirpath, args,
+                        root_abs, root_name, out_root_parent, sliced_root,
+                        emit, stop, index.get(entry.path),
                     )
-                    if not ok_slice:
-                        print(json.dumps({
-                            "status":"slice_error",
-                            "alethe": rel_to(root_abs, alethe_path),
-                            "hole": hole_name,
-                            "line": line_no,
-                            "stderr": rel_to(out_root_parent, stderr_path) if stderr_path else None
-                        }, ensure_ascii=False))
-                        continue
-
-                smt2_dest = find_existing_smt2_for_base(out_dir, base_name)
-                if not smt2_dest:
-                    if not smt2_src or not os.path.isfile(smt2_src):
-                        if os.path.isfile(smt2_for_slice):
-                            smt2_src = smt2_for_slice
-                    target = os.path.join(out_dir, f"{base_name}.smt2")
-                    if smt2_src and os.path.isfile(smt2_src):
-                        if args.no_move:
-                            shutil.copy2(smt2_src, target)
-                            moved_action = "copied"
-                        else:
-                            try:
-                                shutil.move(smt2_src, target)
-                                moved_action = "moved"
-                            except shutil.Error:
-                                shutil.copy2(smt2_src, target)
-                                try:
-                                    os.remove(smt2_src)
-                                except OSError:
-                                    pass
-                                moved_action = "moved_copy"
-                        if args.debug:
-                            print(json.dumps({"debug":"smt2_transfer", "action": moved_action, "to": rel_to(out_root_parent, target)}))
-                        smt2_dest = target
-                    else:
-                        smt2_dest = smt2_for_slice
-
-                elaborate_cached = os.path.exists(out_log_path)
-                if elaborate_cached:
-                    print(json.dumps({
-                        "status": "ok",
-                        "cached": True,
-                        "root": root_name,
-                        "alethe": rel_to(root_abs, alethe_path),
-                        "hole": hole_name,
-                        "slice": rel_to(out_root_parent, slice_path),
-                        "out": rel_to(out_root_parent, out_log_path)
-                    }, ensure_ascii=False))
-                    continue
-
-                ok, succ, fail, pan, elapsed_ns, timed_out = run_elaborate(
-                    slice_path=slice_path,
-                    smt2_path=smt2_dest,
-                    out_log_path=out_log_path,
-                    rare_file=args.rare_file,
-                    allow_int_real=args.allow_int_real_subtyping,
-                    add_pipeline=args.pipeline_hole_local,
-                    no_print_with_sharing=args.no_print_with_sharing,
-                    parse_hole_args=args.parse_hole_args,
-                    timeout_sec=args.elab_timeout_sec,
-                )
-
-                result = {
-                    "root": root_name,
-                    "alethe": rel_to(root_abs, alethe_path),
-                    "hole": hole_name,
-                    "line": line_no,
-                    "slice": rel_to(out_root_parent, slice_path),
-                    "smt2": rel_to(out_root_parent, smt2_dest) if smt2_dest else None,
-                    "out": rel_to(out_root_parent, out_log_path),
-                    "ok": ok,
-                    "success": succ,
-                    "failed": fail,
-                    "panicked": pan,
-                    "timeout": timed_out,
-                    "elapsed": human_elapsed(elapsed_ns),
-                }
-
-                print(json.dumps(result, ensure_ascii=False))
-                append_json_array(os.path.join(out_root_parent, args.results), result)
+                    futures[fut] = entry.path
+
+                # Index updates only happen here, so the index needs no lock
+                for fut in as_completed(futures):
+                    index_entry = fut.result()
+                    if index_entry is not None:
+                        index[futures[fut]] = index_entry
+            except BaseException:
+                # Ctrl-C or a failed file: drop queued files, let running ones stop at their next hole
+                stop.set()
+                executor.shutdown(cancel_futures=True)
+                raise
+    finally:
+        save_index(index_path, index)
 
 if __name__ == "__main__":
     main()
@@ -6,7 +6,45 @@ import sys
 import time
 import shutil
 import subprocess
-from typing import Dict, Any, Generator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, Generator, Iterable, Iterator, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used instead
+    orjson = None
+
+# Output is block-buffered; flush every this many lines so progress still shows
+EMIT_FLUSH_EVERY = 256
+_emitted = 0
+READ_CHUNK_SIZE = 1024 * 1024
+# carcara slice argv: (<carcara>, "slice", "--from") + (command, alethe, smt2) + SLICE_ARGS_SUFFIX
+SLICE_ARGS_SUFFIX = ("--no-print-with-sharing",)
+# carcara writes here; renamed to the real name once the job's result line is out
+PART_SUFFIX = ".part"
+
+def dump_json(obj) -> str:
+    """One-line JSON (non-ASCII kept as UTF-8), via orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+def _json_loads(data: bytes) -> Any:
+    """orjson when available; whatever it rejects (e.g. NaN) is re-parsed by json, which
+    accepts a bit more and raises the usual error message."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+def emit(obj) -> None:
+    global _emitted
+    sys.stdout.write(dump_json(obj) + "\n")
+    _emitted += 1
+    if _emitted % EMIT_FLUSH_EVERY == 0:
+        sys.stdout.flush()
 
 def human_elapsed(ns: int) -> str:
     if ns < 1_000_000:
@@ -17,50 +55,138 @@ def human_elapsed(ns: int) -> str:
         return f"{ns/1_000_000_000:.2f}s"
     return f"{ns/60_000_000_000:.2f}m"
 
-def iter_jobs(fobj) -> Generator[Dict[str, Any], None, None]:
-    data = fobj.read()
-    data_stripped = data.strip()
-    if not data_stripped:
-        return
-    # Try full JSON first
-    try:
-        obj = json.loads(data_stripped)
-        if isinstance(obj, list):
-            for item in obj:
-                if isinstance(item, dict):
-                    yield item
-        elif isinstance(obj, dict):
-            yield obj
-        else:
-            raise ValueError("Top-level JSON must be object or array of objects")
-        return
-    except json.JSONDecodeError:
-        pass
-    # Fallback: JSON Lines
-    for i, line in enumerate(data.splitlines(), start=1):
+def _jobs_from_document(obj: Any) -> Generator[Dict[str, Any], None, None]:
+    if isinstance(obj, list):
+        for item in obj:
+            if isinstance(item, dict):
+                yield item
+    elif isinstance(obj, dict):
+        yield obj
+    else:
+        raise ValueError("Top-level JSON must be object or array of objects")
+
+def _iter_lines(fobj, first: bytes) -> Iterator[bytes]:
+    """first, then the rest of fobj split on newlines, read in large chunks."""
+    yield first  # a whole line already (readline), so it doesn't wait for the next chunk
+    read = getattr(fobj, "read1", fobj.read)  # read1: don't wait for a full chunk from a pipe
+    carry = b""
+    while True:
+        chunk = read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (carry + chunk).split(b"\n")
+        carry = lines.pop()  # trailing partial line
+        yield from lines
+    if carry:
+        yield carry
+
+def _jobs_from_lines(lines: Iterable[bytes], start: int) -> Generator[Dict[str, Any], None, None]:
+    for i, line in enumerate(lines, start=start):
         line = line.strip()
         if not line:
             continue
         try:
-            obj = json.loads(line)
-        except json.JSONDecodeError as e:
-            print(json.dumps({"status":"error","reason":"invalid JSONL line","line_no":i,"error":str(e)}))
+            obj = _json_loads(line)
+        except ValueError as e:  # JSONDecodeError, or a line that is not valid UTF-8
+            emit({"status":"error","reason":"invalid JSONL line","line_no":i,"error":str(e)})
             continue
         if isinstance(obj, dict):
             yield obj
         else:
-            print(json.dumps({"status":"error","reason":"JSONL item not an object","line_no":i}))
+            emit({"status":"error","reason":"JSONL item not an object","line_no":i})
+
+def iter_jobs(fobj) -> Generator[Dict[str, Any], None, None]:
+    """Jobs from a binary stream holding a JSON object, a JSON array, or JSON Lines."""
+    # Peek past leading whitespace to tell a JSON document from JSON Lines
+    skipped = 0
+    head = fobj.read(1)
+    while head.isspace():
+        skipped += head == b"\n"
+        head = fobj.read(1)
+    if not head:
+        return
+    first = head + fobj.readline()
+    if head != b"[":
+        try:
+            _json_loads(first)
+        except ValueError:
+            pass  # maybe one object spread over several lines
+        else:
+            # JSON Lines: stream the rest, never holding the whole input
+            yield from _jobs_from_lines(_iter_lines(fobj, first), start=skipped + 1)
+            return
+    data = first + fobj.read()
+    try:
+        obj = _json_loads(data)
+    except ValueError:
+        yield from _jobs_from_lines(data.splitlines(), start=skipped + 1)
+        return
+    yield from _jobs_from_document(obj)
+
+# search_root -> (basename -> first path in os.walk order, set of .smt2 paths)
+_tree_indexes: Dict[str, Tuple[Dict[str, str], Set[str]]] = {}
+
+def tree_index(search_root: str) -> Tuple[Dict[str, str], Set[str]]:
+    """Walk search_root once, on first use, instead of once per unresolved job."""
+    idx = _tree_indexes.get(search_root)
+    if idx is None:
+        by_name: Dict[str, str] = {}
+        smt2_paths: Set[str] = set()
+        for dirpath, _dirnames, filenames in os.walk(search_root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                by_name.setdefault(name, path)
+                if name.endswith(".smt2"):
+                    smt2_paths.add(path)
+        idx = _tree_indexes[search_root] = (by_name, smt2_paths)
+    return idx
+
+_created_dirs: Set[str] = set()
+
+def ensure_dir(p: str) -> None:
+    if p not in _created_dirs:
+        os.makedirs(p, exist_ok=True)
+        _created_dirs.add(p)
 
 def find_alethe(search_root: str, rel_or_name: str) -> str:
     cand = os.path.join(search_root, rel_or_name)
     if os.path.isfile(cand):
         return cand
     # fallback by basename search
-    base = os.path.basename(rel_or_name)
-    for dirpath, _dirnames, filenames in os.walk(search_root):
-        if base in filenames:
-            return os.path.join(dirpath, base)
-    return ""
+    return tree_index(search_root)[0].get(os.path.basename(rel_or_name), "")
+
+def smt2_exists(search_root: str, path: str) -> bool:
+    idx = _tree_indexes.get(search_root)
+    return (idx is not None and path in idx[1]) or os.path.isfile(path)
+
+def fast_rel(path: str, prefix: str) -> str:
+    """os.path.relpath(path, prefix) for a prefix ending in os.sep, by slicing when path is already normalized under it."""
+    if path.startswith(prefix):
+        rel = path[len(prefix):]
+        if rel and not rel.startswith(os.sep) and os.path.normpath(rel) == rel:
+            return rel
+    return os.path.relpath(path, prefix)
+
+def run_slice(cmd_prefix: Tuple[str, ...], command: str, src_alethe: str, src_smt2: str, out_file: str, err_file: str, debug: bool) -> Dict[str, Any]:
+    start_ns = time.monotonic_ns()
+    # carcara writes the proof straight into the file; only its (short) stderr is held here
+    with open(out_file + PART_SUFFIX, "wb") as out_f:
+        completed = subprocess.run(
+            cmd_prefix + (command, src_alethe, src_smt2) + SLICE_ARGS_SUFFIX,
+            stdout=out_f,
+            stderr=subprocess.PIPE,
+        )
+        out_size = os.fstat(out_f.fileno()).st_size
+
+    end_ns = time.monotonic_ns()
+    elapsed = human_elapsed(end_ns - start_ns)
+
+    status = "ok" if completed.returncode == 0 and out_size != 0 else "error"
+    # An empty .stderr is only kept with --debug
+    if completed.stderr or debug:
+        with open(err_file, "wb") as err_f:
+            err_f.write(completed.stderr)
+    return {"status": status, "elapsed": elapsed}
 
 def main():
     ap = argparse.ArgumentParser(
@@ -73,153 +199,194 @@ def main():
                          "Default: parent of CWD. Example: --out-root .. or --out-root /repo")
     ap.add_argument("--debug", action="store_true",
                     help="Print debug info and resolved paths")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Number of carcara slices run concurrently (default: 1). Concurrent slices "
+                         "compete for CPU, so the reported 'elapsed' then depends on machine load.")
     args = ap.parse_args()
+    if not sys.stdout.isatty():
+        # Pipes get batched writes; emit() flushes every EMIT_FLUSH_EVERY lines and
+        # the main loop flushes before blocking on slices, so progress is never held back
+        sys.stdout.reconfigure(line_buffering=False)
 
     # Check carcara availability
-    if shutil.which("carcara") is None:
-        print(json.dumps({"status":"error","reason":"carcara not found in PATH"}))
+    # Resolved once; every job execs this path directly
+    carcara = shutil.which("carcara")
+    if carcara is None:
+        emit({"status":"error","reason":"carcara not found in PATH"})
         sys.exit(1)
+    slice_prefix = (carcara, "slice", "--from")
 
     cwd = os.getcwd()
     parent = os.path.abspath(os.path.join(cwd, ".."))
     out_root_parent = os.path.abspath(args.out_root) if args.out_root else parent
     sliced_root = os.path.join(out_root_parent, "sliced_proofs")
-    os.makedirs(sliced_root, exist_ok=True)
+    ensure_dir(sliced_root)
 
     if args.debug:
-        print(json.dumps({
+        emit({
             "debug":"paths",
             "cwd": cwd,
             "out_root_parent": out_root_parent,
             "sliced_root": sliced_root
-        }))
+        })
 
     search_root = cwd  # Only search within current folder
+    # Run-wide roots as "<dir>/" prefixes for fast_rel
+    cwd_prefix = os.path.join(cwd, "")
+    search_prefix = os.path.join(search_root, "")
+    out_prefix = os.path.join(out_root_parent, "")
 
     if args.input == "-" or args.input == "/dev/stdin":
-        fobj = sys.stdin
+        fobj = sys.stdin.buffer
     else:
-        fobj = open(args.input, "r", encoding="utf-8")
-
-    with fobj:
-        for job in iter_jobs(fobj):
-            folder = job.get("folder", "") or ""
-            file_field = job.get("file")
-            command = job.get("command")
-            line_no = job.get("line", None)
-
-            if not file_field or not command:
-                print(json.dumps({
-                    "status":"error",
-                    "reason":"missing file or command",
-                    "job": job
-                }))
-                continue
-
-            # Locate input files relative to CWD
-            src_alethe = find_alethe(search_root, file_field)
-            if not src_alethe:
-                print(json.dumps({
-                    "status":"not_found",
-                    "reason":"alethe file not found under CWD",
-                    "cwd": cwd,
-                    "file": file_field
-                }))
-                continue
-
-            if not src_alethe.endswith(".alethe"):
-                print(json.dumps({
-                    "status":"error",
-                    "reason":"located file does not end with .alethe",
-                    "path": os.path.relpath(src_alethe, cwd)
-                }))
-                continue
-
-            src_smt2 = src_alethe[:-7]  # strip ".alethe"
-            if not os.path.isfile(src_smt2):
-                print(json.dumps({
-                    "status":"error",
-                    "reason":"matching .smt2 not found",
-                    "alethe": os.path.relpath(src_alethe, cwd)
-                }))
-                continue
-            
-            if '.' in command:
-                continue
-            
+        fobj = open(args.input, "rb")
+
+    # Jobs submitted but not yet reported: future -> (result fields, out_file, err_file)
+    pending: Dict[Future, Tuple[Dict[str, Any], str, str]] = {}
+    window = 2 * max(1, args.jobs)
+
+    def report(fut: Future) -> None:
+        result, out_file, err_file = pending.pop(fut)
+        result.update(fut.result())
 
-            rel_from_search = os.path.relpath(src_alethe, search_root)
-            rel_dir = os.path.dirname(rel_from_search)
-            base_name = os.path.splitext(os.path.basename(src_smt2))[0]
+        if result["status"] != "ok":
+            # Attach short hint to stderr path
+            result["stderr"] = fast_rel(err_file, out_prefix)
+
+        emit(result)
+        # Only now does the output count as cached for later runs
+        os.replace(out_file + PART_SUFFIX, out_file)
+
+    with fobj, ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        try:
+            submitted = set()
+            for job in iter_jobs(fobj):
+                # Report slices as they finish, not in input order
+                for fut in [f for f in pending if f.done()]:
+                    report(fut)
 
-            # Use the folder reported in JSON for naming under sliced_proofs;
-            # if absent, fall back to the name of the current directory.
-            top_folder_name = folder if folder else os.path.basename(cwd)
+                folder = job.get("folder", "") or ""
+                file_field = job.get("file")
+                command = job.get("command")
+                line_no = job.get("line", None)
 
-            out_dir = os.path.join(sliced_root, top_folder_name, rel_dir, base_name)
-            os.makedirs(out_dir, exist_ok=True)
+                if not file_field or not command:
+                    emit({
+                        "status":"error",
+                        "reason":"missing file or command",
+                        "job": job
+                    })
+                    continue
 
-            out_file = os.path.join(out_dir, f"{base_name}__from-{command}.smt2.alethe")
-            err_file = out_file + ".stderr"
+                if not isinstance(command, str):
+                    emit({
+                        "status":"error",
+                        "reason":"command is not a string",
+                        "job": job
+                    })
+                    continue
+
+                # Subproof steps are never sliced; drop them before any filesystem work
+                if '.' in command:
+                    continue
+
+                # Locate input files relative to CWD
+                src_alethe = find_alethe(search_root, file_field)
+                if not src_alethe:
+                    emit({
+                        "status":"not_found",
+                        "reason":"alethe file not found under CWD",
+                        "cwd": cwd,
+                        "file": file_field
+                    })
+                    continue
+
+                if not src_alethe.endswith(".alethe"):
+                    emit({
+                        "status":"error",
+                        "reason":"located file does not end with .alethe",
+                        "path": fast_rel(src_alethe, cwd_prefix)
+                    })
+                    continue
+
+                src_smt2 = src_alethe[:-7]  # strip ".alethe"
+                if not smt2_exists(search_root, src_smt2):
+                    emit({
+                        "status":"error",
+                        "reason":"matching .smt2 not found",
+                        "alethe": fast_rel(src_alethe, cwd_prefix)
+                    })
+                    continue
+
+                rel_from_search = fast_rel(src_alethe, search_prefix)
+                rel_dir = os.path.dirname(rel_from_search)
+                base_name = os.path.splitext(os.path.basename(src_smt2))[0]
+
+                # Use the folder reported in JSON for naming under sliced_proofs;
+                # if absent, fall back to the name of the current directory.
+                top_folder_name = folder if folder else os.path.basename(cwd)
+
+                out_dir = os.path.join(sliced_root, top_folder_name, rel_dir, base_name)
+                ensure_dir(out_dir)
+
+                out_file = os.path.join(out_dir, f"{base_name}__from-{command}.smt2.alethe")
+                err_file = out_file + ".stderr"
             
-             # === Skip if the output already exists ===
-            if os.path.exists(out_file):
-                # Optional: keep a log line so your pipeline still sees progress
-                print(json.dumps({
+                 # === Skip if the output already exists ===
+                if out_file in submitted or os.path.exists(out_file):
+                    # Optional: keep a log line so your pipeline still sees progress
+                    emit({
+                        "folder": top_folder_name,
+                        "file": file_field,
+                        "command": command,
+                        "line": line_no,
+                        "out": fast_rel(out_file, out_prefix),
+                        "status": "ok",
+                        "cached": True
+                    })
+                    continue
+
+                if args.debug:
+                    emit({
+                        "debug":"resolved_paths",
+                        "src_alethe": fast_rel(src_alethe, cwd_prefix),
+                        "src_smt2": fast_rel(src_smt2, cwd_prefix),
+                        "out_file": fast_rel(out_file, out_prefix),
+                        "err_file": fast_rel(err_file, out_prefix)
+                    })
+
+                # Keep at most `window` jobs in flight, so results stream while input is read
+                if len(pending) >= window:
+                    sys.stdout.flush()
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        report(fut)
+
+                submitted.add(out_file)
+                fut = executor.submit(run_slice, slice_prefix, command, src_alethe, src_smt2, out_file, err_file, args.debug)
+                pending[fut] = ({
                     "folder": top_folder_name,
                     "file": file_field,
                     "command": command,
                     "line": line_no,
-                    "out": os.path.relpath(out_file, out_root_parent),
-                    "status": "ok",
-                    "cached": True
-                }, ensure_ascii=False))
-                continue
-
-            if args.debug:
-                print(json.dumps({
-                    "debug":"resolved_paths",
-                    "src_alethe": os.path.relpath(src_alethe, cwd),
-                    "src_smt2": os.path.relpath(src_smt2, cwd),
-                    "out_file": os.path.relpath(out_file, out_root_parent),
-                    "err_file": os.path.relpath(err_file, out_root_parent)
-                }))
-
-            start_ns = time.monotonic_ns()
-            with open(out_file, "w", encoding="utf-8") as out_f, open(err_file, "w", encoding="utf-8") as err_f:
-                proc = subprocess.check_output(
-                    ["carcara", "slice", "--from", str(command), src_alethe, src_smt2, "--no-print-with-sharing"],
-                    text=True,
-                )
-                out_f.write(proc)
-                
-            end_ns = time.monotonic_ns()
-            elapsed = human_elapsed(end_ns - start_ns)
-
-            status = "ok" if proc.__len__() != 0 else "error"
-            # Keep .stderr even if empty when debug=false? If empty and not debug, remove.
-            if not args.debug:
-                try:
-                    if os.path.getsize(err_file) == 0:
-                        os.remove(err_file)
-                except FileNotFoundError:
-                    pass
-
-            result = {
-                "folder": top_folder_name,
-                "file": file_field,
-                "command": command,
-                "line": line_no,
-                "out": os.path.relpath(out_file, out_root_parent),
-                "status": status,
-                "elapsed": elapsed,
-            }
-
-            if status != "ok":
-                # Attach short hint to stderr path
-                result["stderr"] = os.path.relpath(err_file, out_root_parent)
-
-            print(json.dumps(result, ensure_ascii=False))
+                    "out": fast_rel(out_file, out_prefix),
+                }, out_file, err_file)
+
+            while pending:
+                sys.stdout.flush()
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    report(fut)
+        except BaseException:
+            # Ctrl-C or a failed job: don't start queued slices, and drop outputs never reported
+            executor.shutdown(cancel_futures=True)
+            for _result, out_file, err_file in pending.values():
+                for leftover in (out_file + PART_SUFFIX, err_file):
+                    try:
+                        os.remove(leftover)
+                    except OSError:
+                        pass
+            raise
 
 if __name__ == "__main__":
     main()
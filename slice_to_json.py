@@ -1,10 +1,98 @@
 #!/usr/bin/env python3
+import itertools
+import mmap
 import os
 import re
 import sys
 import json
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
 
-STEP_NAME_RE = re.compile(r"\(step\s+([^\s\)]+)")
+STEP_NAME_RE = re.compile(rb"\(step\s+([^\s\)]+)")
+HOLE_MARKER = b"TRUST_THEORY_REWRITE"
+# Below this many bytes in total, process start-up and pickling cost more than the scan
+PROCESS_POOL_MIN_BYTES = 256 * 1024 * 1024
+# Below this many files threads are used without looking at sizes at all
+PROCESS_POOL_MIN_FILES = 256
+PROCESS_POOL_CHUNKSIZE = 64
+
+def iter_files(root: str) -> Iterator["os.DirEntry[str]"]:
+    """Yield *.alethe file entries under root in os.walk's top-down order, straight from scandir."""
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                if entry.is_dir():
+                    if not entry.is_symlink():  # like os.walk, don't descend into symlinked dirs
+                        subdirs.append(entry.path)
+                elif entry.name.endswith(".alethe"):  # hole steps only occur in Alethe proofs
+                    yield entry
+        stack.extend(reversed(subdirs))
+
+def _count_newlines(chunk: bytes, has_cr: bool) -> int:
+    # Universal newlines, as text-mode reading counted them: \n, \r\n and lone \r
+    n = chunk.count(b"\n")
+    if has_cr:
+        n += chunk.count(b"\r") - chunk.count(b"\r\n")
+    return n
+
+def scan_file(fpath: str, root_abs: str, root_name: str) -> List[Dict[str, Any]]:
+    found = []
+    try:
+        with open(fpath, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                return found
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                has_cr = mm.find(b"\r") != -1
+                lineno, counted = 1, 0
+                # Only inspect lines that mention TRUST_THEORY_REWRITE; only step names are decoded
+                idx = mm.find(HOLE_MARKER)
+                while idx != -1:
+                    start = mm.rfind(b"\n", 0, idx) + 1
+                    end = mm.find(b"\n", idx)
+                    if end == -1:
+                        end = len(mm)
+                    if has_cr:
+                        start = max(start, mm.rfind(b"\r", start, idx) + 1)
+                        cr = mm.find(b"\r", idx, end)
+                        if cr != -1:
+                            end = cr
+                    lineno += _count_newlines(mm[counted:start], has_cr)
+                    counted = start
+                    m = STEP_NAME_RE.search(mm, start, end)
+                    if m:
+                        found.append({
+                            "folder": root_name,
+                            "file": os.path.relpath(fpath, root_abs),
+                            "command": m.group(1).decode("utf-8", errors="ignore"),
+                            "line": lineno
+                        })
+                    idx = mm.find(HOLE_MARKER, end)
+    except Exception:
+        # Skip unreadable files silently
+        pass
+    return found
+
+def _entry_size(entry: "os.DirEntry[str]") -> int:
+    try:
+        return entry.stat().st_size
+    except OSError:
+        return 0
+
+def make_executor(entries: List["os.DirEntry[str]"]) -> Tuple[Executor, int]:
+    """Processes when there are several CPUs and enough bytes to keep them busy, else threads.
+    Sizes cost a stat per file, so they are only summed for large trees, up to the threshold."""
+    cpus = os.cpu_count() or 1
+    if (cpus > 1 and len(entries) >= PROCESS_POOL_MIN_FILES
+            and any(total >= PROCESS_POOL_MIN_BYTES for total in itertools.accumulate(map(_entry_size, entries)))):
+        return ProcessPoolExecutor(max_workers=cpus), PROCESS_POOL_CHUNKSIZE
+    # File reads release the GIL, so threads are enough for small trees
+    return ThreadPoolExecutor(max_workers=min(32, cpus * 4)), 1
 
 def main():
     root = sys.argv[1] if len(sys.argv) > 1 else "."
@@ -14,25 +102,14 @@ def main():
 
     results = []
 
-    for dirpath, _, filenames in os.walk(root_abs):
-        for fname in filenames:
-            fpath = os.path.join(dirpath, fname)
-            try:
-                with open(fpath, "r", encoding="utf-8", errors="ignore") as fh:
-                    for lineno, line in enumerate(fh, start=1):
-                        # Only inspect lines that mention TRUST_THEORY_REWRITE
-                        if "TRUST_THEORY_REWRITE" in line:
-                            m = STEP_NAME_RE.search(line)
-                            if m:
-                                results.append({
-                                    "folder": root_name,
-                                    "file": os.path.relpath(fpath, root_abs),
-                                    "command": m.group(1),
-                                    "line": lineno
-                                })
-            except Exception:
-                # Skip unreadable/binary files silently
-                continue
+    entries = list(iter_files(root_abs))
+    executor, chunksize = make_executor(entries)
+    # map keeps results in walk order
+    with executor:
+        for found in executor.map(scan_file, [e.path for e in entries],
+                                  itertools.repeat(root_abs), itertools.repeat(root_name),
+                                  chunksize=chunksize):
+            results.extend(found)
 
     with open(out_path, "w", encoding="utf-8") as out:
         json.dump(results, out, ensure_ascii=False, indent=2)